@@ -1,12 +1,18 @@
-import pandas as pd
-from slack_sdk import WebClient
-from slack_sdk.errors import SlackApiError
-import schedule
-import time
+from __future__ import annotations
+
 import os
 import logging
+from logging.handlers import RotatingFileHandler
 from dotenv import load_dotenv
 import sys
+from datetime import date, datetime
+from typing import TYPE_CHECKING
+
+# pandas, numpy and slack_sdk are imported where they are used, so startup and
+# early-exit paths don't pay for loading them.
+if TYPE_CHECKING:
+    import pandas as pd
+    from slack_sdk import WebClient
 
 # --------------------------------
 # Load Environment Variables
@@ -18,24 +24,43 @@ load_dotenv()
 # --------------------------------
 SLACK_TOKEN = os.getenv('SLACK_BOT_TOKEN')
 CHANNEL_ID = os.getenv('SLACK_CHANNEL')
+SLACK_SECTION_LIMIT = 3000  # Max characters in a Slack section block
+SLACK_MAX_ATTEMPTS = int(os.getenv('SLACK_MAX_ATTEMPTS', 5))
+# A .csv path is imported once into a sibling .parquet file, which is the source of
+# truth from then on. Point CSV_FILE at the .parquet file directly after migrating.
 CSV_FILE = os.getenv('CSV_FILE', 'DSA_Practice_Questions.csv')
 QUESTIONS_PER_DAY = int(os.getenv('QUESTIONS_PER_DAY', 6))
-SEND_TIME = os.getenv('SEND_TIME', '10:00')
+# 'sequential' sends the first unpushed questions; 'date' sends the block for the
+# current day counted from START_DATE (YYYY-MM-DD).
+SELECTION_STRATEGY = os.getenv('SELECTION_STRATEGY', 'sequential').lower()
+START_DATE = os.getenv('START_DATE')
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+# Records the last day questions were sent, so repeat runs can skip loading the data.
+STATE_FILE = os.getenv('STATE_FILE', 'last_pushed_day.txt')
+
+QUESTION_COLUMNS = ["Question", "Topic", "Category", "Pushed"]
+# Topic and Category repeat a small set of labels, so store them as categoricals.
+QUESTION_DTYPES = {"Topic": "category", "Category": "category", "Pushed": "boolean"}
 
 # --------------------------------
 # Logging Configuration
 # --------------------------------
+_invalid_log_level = LOG_LEVEL not in logging.getLevelNamesMapping()
+
 logging.basicConfig(
-    level=logging.DEBUG,  # Set to DEBUG for detailed logs
+    level='INFO' if _invalid_log_level else LOG_LEVEL,  # Set LOG_LEVEL=DEBUG for detailed logs
     format='%(asctime)s [%(levelname)s] %(message)s',
     datefmt='%Y-%m-%d %H:%M:%S',
     handlers=[
-        logging.FileHandler("dsa_notifier.log"),
+        RotatingFileHandler("dsa_notifier.log", maxBytes=1_000_000, backupCount=3),
         logging.StreamHandler(sys.stdout)
     ]
 )
 logger = logging.getLogger(__name__)
 
+if _invalid_log_level:
+    logger.warning("Unknown LOG_LEVEL '%s'. Falling back to INFO.", LOG_LEVEL)
+
 logger.info("Starting DSA Notifier script initialization.")
 
 if not SLACK_TOKEN:
@@ -44,52 +69,188 @@ if not SLACK_TOKEN:
 if not CHANNEL_ID:
     logger.error("Slack Channel ID not found. Please set SLACK_CHANNEL in the .env file.")
     sys.exit(1)
+if SELECTION_STRATEGY not in ('sequential', 'date'):
+    logger.error("Unknown SELECTION_STRATEGY '%s'. Use 'sequential' or 'date'.", SELECTION_STRATEGY)
+    sys.exit(1)
+if SELECTION_STRATEGY == 'date':
+    if not START_DATE:
+        logger.error("START_DATE is required when SELECTION_STRATEGY is 'date'.")
+        sys.exit(1)
+    try:
+        START_DATE = datetime.strptime(START_DATE, '%Y-%m-%d')
+    except ValueError:
+        logger.error("Invalid START_DATE '%s'. Expected format YYYY-MM-DD.", START_DATE)
+        sys.exit(1)
+
+_client: WebClient | None = None
+
+
+def get_client() -> WebClient:
+    """Return the shared Slack client, creating it on first use."""
+    global _client
+    if _client is None:
+        from slack_sdk import WebClient
+        _client = WebClient(token=SLACK_TOKEN)
+    return _client
+
+
+def migrate_to_parquet(data_file: str) -> str:
+    """Convert a legacy CSV question file to Parquet once and return the Parquet path."""
+    if not data_file.endswith('.csv'):
+        return data_file
+
+    parquet_file = os.path.splitext(data_file)[0] + '.parquet'
+    if not os.path.exists(data_file):
+        return parquet_file
+    if os.path.exists(parquet_file):
+        if os.path.getmtime(data_file) > os.path.getmtime(parquet_file):
+            logger.warning(
+                "%s is newer than %s, but questions are read from the Parquet file. "
+                "Delete %s to re-import the CSV (its Pushed column is used as-is).",
+                data_file, parquet_file, parquet_file,
+            )
+        return parquet_file
+
+    logger.info("Migrating %s to Parquet at %s.", data_file, parquet_file)
+    import pandas as pd
+    try:
+        df = pd.read_csv(
+            data_file,
+            usecols=lambda column: column in QUESTION_COLUMNS,
+            dtype=QUESTION_DTYPES,
+            skipinitialspace=True,
+            engine="c",
+        )
+    except (pd.errors.ParserError, ValueError) as e:
+        # Malformed rows, or values that don't fit QUESTION_DTYPES (e.g. a Pushed
+        # value other than True/False). Leave the Parquet file absent so
+        # load_questions yields an empty frame and job() reports it to Slack.
+        logger.error("Error parsing CSV file %s: %s", data_file, e)
+        return parquet_file
+    except Exception as e:
+        # Leave the Parquet file absent so load_questions yields an empty frame
+        # and job() reports the failure to Slack.
+        logger.error("An unexpected error occurred while migrating the CSV: %s", e)
+        return parquet_file
+    save_questions(ensure_pushed_column(df), parquet_file)
+    return parquet_file
+
 
-client = WebClient(token=SLACK_TOKEN)
+def ensure_pushed_column(df: pd.DataFrame) -> pd.DataFrame:
+    """Make sure the Pushed column exists and uses the nullable boolean dtype."""
+    import pandas as pd
 
+    if "Pushed" not in df.columns:
+        logger.debug("Pushed column missing. Initializing all questions as not pushed.")
+        df["Pushed"] = pd.array([False] * len(df), dtype="boolean")
+    else:
+        df["Pushed"] = df["Pushed"].astype("boolean").fillna(False)
+    return df
+
+
+def load_questions(data_file: str) -> pd.DataFrame:
+    import pandas as pd
 
-def load_questions(csv_file: str) -> pd.DataFrame:
-    logger.debug(f"Attempting to load questions from {csv_file}.")
+    logger.debug("Attempting to load questions from %s.", data_file)
     try:
-        df = pd.read_csv(csv_file)
-        logger.debug(f"Questions loaded successfully. Total questions: {len(df)}.")
+        df = ensure_pushed_column(pd.read_parquet(data_file))
+        logger.debug("Questions loaded successfully. Total questions: %d.", len(df))
         return df
     except FileNotFoundError:
-        logger.error(f"CSV file not found at {csv_file}. Please ensure the file exists.")
-        return pd.DataFrame()
-    except pd.errors.ParserError as e:
-        logger.error(f"Error parsing CSV file: {e}")
+        logger.error("Questions file not found at %s. Please ensure the file exists.", data_file)
         return pd.DataFrame()
     except Exception as e:
-        logger.error(f"An unexpected error occurred while loading the CSV: {e}")
+        logger.error("An unexpected error occurred while loading the questions file: %s", e)
         return pd.DataFrame()
 
 
-def save_questions(df: pd.DataFrame, csv_file: str):
-    logger.debug(f"Saving updated questions to {csv_file}.")
+def save_questions(df: pd.DataFrame, data_file: str) -> bool:
+    logger.debug("Saving updated questions to %s.", data_file)
+    tmp_file = data_file + ".tmp"
     try:
-        df.to_csv(csv_file, index=False)
-        logger.debug("CSV file saved successfully.")
+        # Write next to the target and rename over it, so an interrupted save
+        # never leaves a truncated questions file behind.
+        with open(tmp_file, "wb") as f:
+            df.to_parquet(f, index=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, data_file)
+        logger.debug("Questions file saved successfully.")
+        return True
     except Exception as e:
-        logger.error(f"Failed to save CSV file: {e}")
+        logger.error("Failed to save questions file: %s", e)
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        return False
 
 
-def get_next_questions(df: pd.DataFrame, questions_per_day: int) -> pd.DataFrame:
+def get_next_questions(df: pd.DataFrame, questions_per_day: int) -> tuple[int, int, pd.DataFrame]:
+    import numpy as np
+
     logger.debug("Identifying the last pushed question.")
 
-    start_idx = (df["Pushed"] != "True").idxmax()
-    end_idx = start_idx + questions_per_day
+    pushed = df["Pushed"].to_numpy(dtype=bool, na_value=False)
+    if pushed.all():
+        logger.info("No more unpushed questions available.")
+        return len(df), len(df), df.iloc[0:0]
+
+    start_idx = int(np.argmax(~pushed))
+    end_idx = min(start_idx + questions_per_day, len(df))
 
-    logger.debug(f"Selecting questions from index {start_idx} to {end_idx}.")
+    logger.debug("Selecting questions from index %d to %d.", start_idx, end_idx)
 
     next_questions = df.iloc[start_idx:end_idx]
 
     if next_questions.empty:
         logger.info("No more unpushed questions available.")
     else:
-        logger.debug(f"Selected {len(next_questions)} questions to push.")
+        logger.debug("Selected %d questions to push.", len(next_questions))
+
+    return start_idx, end_idx, next_questions
+
+
+def get_today_questions(df: pd.DataFrame, questions_per_day: int, today: date) -> tuple[int, int, pd.DataFrame]:
+    logger.debug("Calculating today's questions from START_DATE.")
+
+    delta_days = (today - START_DATE.date()).days
+    logger.debug("Delta Days: %d", delta_days)
+
+    if delta_days < 0:
+        logger.info("START_DATE is in the future. No questions scheduled yet.")
+        return 0, 0, df.iloc[0:0]
+
+    start_idx = min(delta_days * questions_per_day, len(df))
+    end_idx = min(start_idx + questions_per_day, len(df))
+
+    logger.debug("Selecting questions from index %d to %d.", start_idx, end_idx)
+
+    today_questions = df.iloc[start_idx:end_idx]
+
+    if today_questions.empty:
+        logger.info("No questions scheduled for today.")
+    else:
+        logger.debug("Selected %d questions for today.", len(today_questions))
 
-    return next_questions
+    return start_idx, end_idx, today_questions
+
+
+def read_last_pushed_day(state_file: str) -> str | None:
+    try:
+        with open(state_file) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        logger.warning("Failed to read state file %s: %s", state_file, e)
+        return None
+
+
+def write_last_pushed_day(state_file: str, day: date):
+    try:
+        with open(state_file, "w") as f:
+            f.write(day.isoformat())
+    except OSError as e:
+        logger.warning("Failed to write state file %s: %s", state_file, e)
 
 
 def format_questions(questions_df: pd.DataFrame) -> str:
@@ -97,87 +258,174 @@ def format_questions(questions_df: pd.DataFrame) -> str:
         logger.info("No questions to format. Preparing completion message.")
         return "🎉 *Congratulations!* You've completed all the practice questions. Keep up the great work! 🎉"
 
-    message = "*Today's DSA Practice Questions:* 📚\n"
-    for idx, row in questions_df.iterrows():
+    parts = ["*Today's DSA Practice Questions:* 📚\n"]
+    # Iterate over plain column arrays rather than building a Series per row.
+    rows = zip(
+        questions_df.index.to_numpy(),
+        questions_df['Question'].to_numpy(),
+        questions_df['Topic'].to_numpy(),
+        questions_df['Category'].to_numpy(),
+    )
+    for idx, question, topic, category in rows:
         question_number = idx + 1  # Assuming 0-based index
-        question = row['Question']
-        topic = row['Topic']
-        category = row['Category']
-        message += f"\n• *Question {question_number}:* {question}\n  _Topic:_ {topic} | _Category:_ {category}\n"
+        parts.append(f"\n• *Question {question_number}:* {question}\n  _Topic:_ {topic} | _Category:_ {category}\n")
+
+    return "".join(parts)
+
 
-    return message
+# Slack error codes that are worth retrying; anything else (bad token, unknown
+# channel, ...) fails immediately.
+RETRYABLE_SLACK_ERRORS = {"ratelimited", "internal_error", "fatal_error", "service_unavailable", "request_timeout"}
 
 
-def send_slack_message(message: str, channel: str = CHANNEL_ID) -> bool:
+def _is_retryable_slack_error(exc: BaseException) -> bool:
+    from slack_sdk.errors import SlackApiError
+
+    if isinstance(exc, SlackApiError):
+        return exc.response.get("error") in RETRYABLE_SLACK_ERRORS
+    # Network failures from urllib surface as OSError subclasses.
+    return isinstance(exc, OSError)
+
+
+def _slack_retry_wait(retry_state) -> float:
+    """Honour Slack's Retry-After header when rate limited, otherwise back off exponentially."""
+    from slack_sdk.errors import SlackApiError
+    from tenacity import wait_exponential_jitter
+
+    exc = retry_state.outcome.exception()
+    if isinstance(exc, SlackApiError) and exc.response.get("error") == "ratelimited":
+        retry_after = exc.response.headers.get("Retry-After")
+        if retry_after is not None:
+            return float(retry_after)
+    return wait_exponential_jitter(initial=1, max=30)(retry_state)
+
+
+def _log_slack_retry(retry_state):
+    from slack_sdk.errors import SlackApiError
+
+    exc = retry_state.outcome.exception()
+    reason = exc.response.get("error") if isinstance(exc, SlackApiError) else exc
+    logger.warning(
+        "Slack request failed on attempt %d: %s. Retrying in %.1fs.",
+        retry_state.attempt_number, reason, retry_state.next_action.sleep,
+    )
+
+
+def send_slack_message(message: str, channel: str = CHANNEL_ID, blocks: list | None = None) -> bool:
+    from slack_sdk.errors import SlackApiError
+    from tenacity import Retrying, retry_if_exception, stop_after_attempt
+
     logger.debug("Attempting to send message to Slack.")
     try:
-        response = client.chat_postMessage(channel=channel, text=message)
+        for attempt in Retrying(
+            stop=stop_after_attempt(SLACK_MAX_ATTEMPTS),
+            wait=_slack_retry_wait,
+            retry=retry_if_exception(_is_retryable_slack_error),
+            before_sleep=_log_slack_retry,
+            reraise=True,
+        ):
+            with attempt:
+                response = get_client().chat_postMessage(channel=channel, text=message, blocks=blocks)
         if response['ok']:
             logger.info("Message sent successfully to Slack.")
             return True
         else:
-            logger.error(f"Failed to send message to Slack: {response['error']}")
+            logger.error("Failed to send message to Slack: %s", response['error'])
             return False
     except SlackApiError as e:
-        logger.error(f"Slack API Error: {e.response['error']}")
+        logger.error("Slack API Error: %s", e.response['error'])
         return False
     except Exception as e:
-        logger.error(f"Unexpected error while sending message to Slack: {e}")
+        logger.error("Unexpected error while sending message to Slack: %s", e)
+        return False
+
+
+class SlackBatcher:
+    """Collects message texts during a job and posts them as one Slack message."""
+
+    def __init__(self, channel: str = CHANNEL_ID):
+        self.channel = channel
+        self._texts: list[str] = []
+
+    def add(self, text: str):
+        self._texts.append(text)
+
+    def flush(self) -> bool:
+        """Post everything collected so far in a single chat.postMessage call."""
+        if not self._texts:
+            return True
+
+        text = "\n\n".join(self._texts)
+        blocks = None
+        # Slack rejects section blocks longer than 3000 characters; fall back to plain text.
+        if all(len(t) <= SLACK_SECTION_LIMIT for t in self._texts):
+            blocks = [{"type": "section", "text": {"type": "mrkdwn", "text": t}} for t in self._texts]
+
+        logger.debug("Flushing %d queued message(s) to Slack.", len(self._texts))
+        if send_slack_message(text, self.channel, blocks=blocks):
+            self._texts.clear()
+            return True
         return False
 
 
 def job():
     logger.info("Running scheduled job.")
-    df = load_questions(CSV_FILE)
+    # Read the clock once so every step of this run agrees on the current day.
+    today = datetime.now().date()
+
+    if read_last_pushed_day(STATE_FILE) == today.isoformat():
+        logger.info("Questions were already pushed today. Delete %s to send again.", STATE_FILE)
+        return
+
+    batcher = SlackBatcher()
+    data_file = migrate_to_parquet(CSV_FILE)
+    df = load_questions(data_file)
 
     if df.empty:
-        logger.warning("No data loaded from CSV. Exiting job.")
-        send_slack_message("❗ *DSA Notifier Error:* Questions data not found or failed to load.")
+        logger.warning("No data loaded from questions file. Exiting job.")
+        batcher.add("❗ *DSA Notifier Error:* Questions data not found or failed to load.")
+        batcher.flush()
         return
 
-    next_questions = get_next_questions(df, QUESTIONS_PER_DAY)
+    if SELECTION_STRATEGY == 'date':
+        start_idx, end_idx, next_questions = get_today_questions(df, QUESTIONS_PER_DAY, today)
+    else:
+        start_idx, end_idx, next_questions = get_next_questions(df, QUESTIONS_PER_DAY)
 
     if next_questions.empty:
         logger.info("No new questions to send.")
-        send_slack_message("🔔 *DSA Notifier:* No new questions to send today.")
+        batcher.add("🔔 *DSA Notifier:* No new questions to send today.")
+        batcher.flush()
+        return
+
+    # Work on the raw bool array rather than going through .loc.
+    pushed = df["Pushed"].to_numpy(dtype=bool, na_value=False)
+    if pushed[start_idx:end_idx].all():
+        logger.info("Today's questions have already been pushed. Skipping.")
         return
 
     # Prepare message
-    message = format_questions(next_questions)
+    batcher.add(format_questions(next_questions))
+
+    if batcher.flush():
+        import pandas as pd
 
-    if send_slack_message(message):
-        df.loc[next_questions.index, 'Pushed'] = True
-        save_questions(df, CSV_FILE)
-        logger.info(f"Marked questions {next_questions.index.min() + 1} to {next_questions.index.max() + 1} as pushed.")
+        pushed[start_idx:end_idx] = True
+        df["Pushed"] = pd.array(pushed, dtype="boolean")
+        if save_questions(df, data_file):
+            write_last_pushed_day(STATE_FILE, today)
+            logger.info("Marked questions %d to %d as pushed.", start_idx + 1, end_idx)
+        else:
+            logger.error("Questions were sent but could not be marked as pushed.")
     else:
         logger.warning("Failed to send messages to Slack. Will retry on next run.")
 
 
-# --------------------------------
-# Scheduling
-# --------------------------------
-def schedule_job():
-    logger.info(f"Scheduling the job to run every day at {SEND_TIME}.")
-    schedule.every().day.at(SEND_TIME).do(job)
-    logger.info("DSA Notifier is running... Press Ctrl+C to stop.")
-
-    try:
-        while True:
-            schedule.run_pending()
-            time.sleep(60)
-    except KeyboardInterrupt:
-        logger.info("DSA Notifier stopped by user.")
-    except Exception as e:
-        logger.error(f"An unexpected error occurred in the scheduler: {e}")
-
-
 # -------------------------
-# Command-Line Argument Handling
+# Entry Point
 # -------------------------
+# The daily trigger is owned by the OS (see dsa-notifier.timer / dsa-notifier.service,
+# or an equivalent crontab entry), so each invocation runs the job once and exits.
 if __name__ == "__main__":
-    if "--run-now" in sys.argv:
-        logger.info("Running job immediately as per '--run-now' argument.")
-        job()
-        sys.exit(0)
-
-    schedule_job()
+    job()
+    sys.exit(0)